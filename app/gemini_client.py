@@ -5,7 +5,12 @@ This module provides a client for interacting with Google's Gemini model
 on VertexAI for generating AI responses.
 """
 
+import asyncio
 import logging
+import math
+import threading
+import time
+from collections import deque
 from typing import Optional, List, Dict, Any
 
 try:
@@ -18,10 +23,97 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+class HedgingPolicy:
+    """
+    Decides when a duplicate (hedged) Gemini request should be issued
+
+    The hedge delay is derived from a percentile of recently observed
+    time-to-first-token latencies, and the number of extra calls is capped
+    by a token bucket that refills by ``max_hedge_ratio`` per request.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window_size: int = 200,
+        max_hedge_ratio: float = 0.1,
+        max_burst: float = 5.0,
+    ):
+        """
+        Initialize the hedging policy
+
+        Args:
+            percentile: Latency percentile (0.0-1.0) used as the hedge delay
+            initial_delay: Hedge delay in seconds until enough samples exist
+            min_delay: Lower bound for the hedge delay in seconds
+            min_samples: Number of samples required before using the percentile
+            window_size: Number of recent latency samples to keep
+            max_hedge_ratio: Maximum extra calls per request on average
+            max_burst: Maximum number of hedges that can be saved up
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.max_burst = max_burst
+        self.requests = 0
+        self.hedges_issued = 0
+        self.hedges_won = 0
+        self._latencies: deque = deque(maxlen=window_size)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+
+    def record_latency(self, seconds: float) -> None:
+        """Record an observed time-to-first-token latency"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """Return how long to wait for a first token before hedging"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            samples = sorted(self._latencies)
+        index = min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)
+        return max(self.min_delay, samples[max(index, 0)])
+
+    def on_request(self) -> None:
+        """Refill the hedge budget for a new request"""
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.max_burst, self._budget + self.max_hedge_ratio)
+
+    def try_acquire_hedge(self) -> bool:
+        """Consume one hedge from the budget, returning False if exhausted"""
+        with self._lock:
+            if self._budget < 1.0:
+                return False
+            self._budget -= 1.0
+            self.hedges_issued += 1
+            return True
+
+    def record_hedge_win(self) -> None:
+        """Record that a hedged request answered before the primary one"""
+        with self._lock:
+            self.hedges_won += 1
+
+
 class GeminiClient:
     """Client for interacting with Gemini on VertexAI"""
     
-    def __init__(self, project_id: str, location: str, model_name: str = "gemini-2.5-flash"):
+    def __init__(
+        self,
+        project_id: str,
+        location: str,
+        model_name: str = "gemini-2.5-flash",
+        hedging: Optional[HedgingPolicy] = None,
+        hedge_location: Optional[str] = None,
+    ):
         """
         Initialize the Gemini client
         
@@ -29,11 +121,17 @@ class GeminiClient:
             project_id: Google Cloud project ID
             location: VertexAI location (e.g., 'us-central1')
             model_name: Name of the Gemini model to use
+            hedging: Policy enabling hedged requests in generate_response
+            hedge_location: Secondary VertexAI location for hedged requests
+                (defaults to the primary location)
         """
         self.project_id = project_id
         self.location = location
         self.model_name = model_name
         self.model = None
+        self.hedge_model = None
+        self.hedging = hedging
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         if aiplatform is None:
             logger.warning("Google Cloud AI Platform not available. Install with: pip install google-cloud-aiplatform")
@@ -50,6 +148,27 @@ class GeminiClient:
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {e}")
             self.model = None
+            return
+
+        if hedging is None:
+            return
+
+        self.hedge_model = self.model
+        # Hedged attempts run as tasks on a dedicated event loop so that the
+        # losing attempt can be cancelled without holding a worker thread
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="gemini-hedge", daemon=True).start()
+        if hedge_location and hedge_location != location:
+            try:
+                # The model binds to the location configured at construction time,
+                # so switch temporarily to build the secondary-region model
+                aiplatform.init(project=project_id, location=hedge_location)
+                self.hedge_model = generative_models.GenerativeModel(model_name)
+                logger.info(f"Initialized hedge Gemini model in {hedge_location}")
+            except Exception as e:
+                logger.error(f"Failed to initialize hedge Gemini model: {e}")
+            finally:
+                aiplatform.init(project=project_id, location=location)
     
     def generate_response(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> str:
         """
@@ -67,43 +186,26 @@ class GeminiClient:
             return "Sorry, the AI service is currently unavailable."
         
         try:
-            # Configure generation parameters
-            generation_config = generative_models.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-                top_p=0.95,
-                top_k=40
-            )
+            generation_config = self._build_generation_config(max_tokens, temperature)
+            safety_settings = self._build_safety_settings()
             
-            # Safety settings to prevent harmful content
-            safety_settings = [
-                generative_models.SafetySetting(
-                    category=generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
-                ),
-                generative_models.SafetySetting(
-                    category=generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                    threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
-                ),
-                generative_models.SafetySetting(
-                    category=generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                    threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
-                ),
-                generative_models.SafetySetting(
-                    category=generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                    threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
-                ),
-            ]
-            
-            # Generate response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                safety_settings=safety_settings
-            )
+            if self.hedging is not None:
+                future = asyncio.run_coroutine_threadsafe(
+                    self._generate_hedged(prompt, generation_config, safety_settings, time.monotonic()),
+                    self._loop
+                )
+                text = future.result()
+            else:
+                # Generate response
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings
+                )
+                text = response.text
             
-            if response.text:
-                return response.text.strip()
+            if text:
+                return text.strip()
             else:
                 logger.warning("Empty response from Gemini")
                 return "I'm sorry, I couldn't generate a response to that."
@@ -112,6 +214,152 @@ class GeminiClient:
             logger.error(f"Error generating response: {e}")
             return "Sorry, I encountered an error while processing your request."
     
+    def _build_generation_config(self, max_tokens: int, temperature: float):
+        """Build the generation parameters shared by all requests"""
+        return generative_models.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature,
+            top_p=0.95,
+            top_k=40
+        )
+    
+    def _build_safety_settings(self) -> list:
+        """Build safety settings to prevent harmful content"""
+        return [
+            generative_models.SafetySetting(
+                category=generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+            ),
+            generative_models.SafetySetting(
+                category=generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+                threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+            ),
+            generative_models.SafetySetting(
+                category=generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+            ),
+            generative_models.SafetySetting(
+                category=generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT,
+                threshold=generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+            ),
+        ]
+    
+    async def _stream_attempt(
+        self,
+        model,
+        prompt: str,
+        generation_config,
+        safety_settings: list,
+        started_at: float,
+        first_token: asyncio.Event,
+        record_on_cancel: bool = False,
+    ) -> str:
+        """
+        Run one streaming request, signalling first_token as soon as output
+        starts (or the request ends)
+        
+        Time-to-first-token is measured from started_at. When record_on_cancel
+        is set (the primary attempt, timed from the caller's submit time), a
+        cancellation before the first token still records the elapsed time so
+        that slow samples stay in the window. Hedges are timed from when they
+        were issued, so their censored samples would understate latency.
+        """
+        chunks: List[str] = []
+        response_stream = None
+        try:
+            response_stream = await model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+                stream=True
+            )
+            async for chunk in response_stream:
+                if not first_token.is_set():
+                    self.hedging.record_latency(time.monotonic() - started_at)
+                    first_token.set()
+                if chunk.text:
+                    chunks.append(chunk.text)
+        except asyncio.CancelledError:
+            if record_on_cancel and not first_token.is_set():
+                self.hedging.record_latency(time.monotonic() - started_at)
+            # Close the stream so the underlying VertexAI call is cancelled too
+            aclose = getattr(response_stream, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"Error closing cancelled Gemini stream: {e}")
+            raise
+        finally:
+            first_token.set()
+        return "".join(chunks)
+    
+    async def _generate_hedged(
+        self, prompt: str, generation_config, safety_settings: list, started_at: float
+    ) -> str:
+        """
+        Generate a response, issuing a duplicate request if the first one has
+        not produced a token within the adaptive hedge delay
+        
+        Returns:
+            Text of whichever request completed successfully first
+        """
+        policy = self.hedging
+        policy.on_request()
+        
+        primary_first_token = asyncio.Event()
+        primary = asyncio.ensure_future(self._stream_attempt(
+            self.model, prompt, generation_config, safety_settings, started_at,
+            primary_first_token, record_on_cancel=True
+        ))
+        pending = {primary}
+        
+        delay = policy.hedge_delay()
+        remaining = delay - (time.monotonic() - started_at)
+        if remaining > 0:
+            first_token_wait = asyncio.ensure_future(primary_first_token.wait())
+            await asyncio.wait({first_token_wait}, timeout=remaining)
+            first_token_wait.cancel()
+        
+        if not primary_first_token.is_set():
+            if policy.try_acquire_hedge():
+                pending.add(asyncio.ensure_future(self._stream_attempt(
+                    self.hedge_model, prompt, generation_config, safety_settings,
+                    time.monotonic(), asyncio.Event()
+                )))
+                logger.info(
+                    f"No first token from Gemini after {delay:.2f}s, issuing hedged request "
+                    f"(requests={policy.requests}, hedges_issued={policy.hedges_issued}, "
+                    f"hedges_won={policy.hedges_won})"
+                )
+            else:
+                logger.info(
+                    f"No first token from Gemini after {delay:.2f}s, hedge budget exhausted "
+                    f"(requests={policy.requests}, hedges_issued={policy.hedges_issued})"
+                )
+        
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is not primary:
+                        policy.record_hedge_win()
+                        logger.info(
+                            f"Hedged Gemini request answered first "
+                            f"(hedges_issued={policy.hedges_issued}, hedges_won={policy.hedges_won})"
+                        )
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        assert error is not None
+        raise error
+    
     def generate_streaming_response(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7):
         """
         Generate a streaming response using Gemini (for future use)
@@ -129,13 +377,7 @@ class GeminiClient:
             return
         
         try:
-            # Configure generation parameters
-            generation_config = generative_models.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature,
-                top_p=0.95,
-                top_k=40
-            )
+            generation_config = self._build_generation_config(max_tokens, temperature)
             
             # Generate streaming response
             response_stream = self.model.generate_content(
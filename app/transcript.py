@@ -0,0 +1,279 @@
+"""
+Channel transcript compaction
+
+This module preprocesses Slack channel history before it is sent to Gemini
+for summarization, removing noise and redundancy to reduce input tokens.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Message subtypes that carry no conversational content
+SKIPPED_SUBTYPES = {
+    "bot_message",
+    "channel_join",
+    "channel_leave",
+    "channel_topic",
+    "channel_purpose",
+    "channel_name",
+    "channel_archive",
+    "channel_unarchive",
+    "group_join",
+    "group_leave",
+    "pinned_item",
+    "unpinned_item",
+    "reminder_add",
+    "message_deleted",
+}
+
+SUMMARY_PROMPT_HEADER = "Slackチャンネル <#{channel_id}> のメッセージを簡潔に要約してください:\n\n"
+
+MAX_MESSAGE_CHARS = 500
+MAX_CODE_BLOCK_LINES = 5
+# Shorter lines or code blocks (e.g., "ok") are never treated as duplicates
+MIN_DEDUP_CHARS = 10
+
+_CODE_BLOCK_PATTERN = re.compile(r"```(.*?)```", re.DOTALL)
+_LINK_PATTERN = re.compile(r"<(https?://[^>|]+)(?:\|([^>]*))?>")
+_MENTION_PATTERN = re.compile(r"<@([A-Z0-9]+)(?:\|[^>]*)?>")
+
+
+class UserAliasCache:
+    """Resolves Slack user IDs to short display names with a cached users_info lookup"""
+
+    def __init__(self, failure_ttl: float = 60.0):
+        """
+        Initialize an empty alias cache
+
+        Args:
+            failure_ttl: Seconds to wait before retrying a failed lookup
+        """
+        self.failure_ttl = failure_ttl
+        self._aliases: Dict[str, str] = {}
+        self._failed_until: Dict[str, float] = {}
+
+    def get(self, client: Any, user_id: str) -> str:
+        """
+        Return a short alias for the user, falling back to the user ID
+
+        Args:
+            client: Slack WebClient used for users_info lookups
+            user_id: Slack user ID (e.g., 'U123456')
+
+        Returns:
+            Display name, real name, or user name of the user
+        """
+        if user_id in self._aliases:
+            return self._aliases[user_id]
+        # Failures (e.g., ratelimited, missing_scope) are only remembered briefly
+        if time.monotonic() < self._failed_until.get(user_id, 0.0):
+            return user_id
+
+        try:
+            user = client.users_info(user=user_id)["user"]
+        except Exception as e:
+            logger.warning(f"Failed to resolve user {user_id}: {e}")
+            self._failed_until[user_id] = time.monotonic() + self.failure_ttl
+            return user_id
+
+        profile = user.get("profile", {})
+        alias = (
+            profile.get("display_name")
+            or profile.get("real_name")
+            or user.get("name")
+            or user_id
+        )
+        self._aliases[user_id] = alias
+        self._failed_until.pop(user_id, None)
+        return alias
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text
+
+    Non-ASCII characters (e.g., Japanese) count as about one token each,
+    while ASCII text counts as about one token per four characters.
+    """
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    ascii_chars = len(text) - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+def _verbatim_prompt(channel_id: str, messages: List[Dict[str, Any]]) -> str:
+    """Build the uncompacted prompt used as the baseline for token savings"""
+    prompt = SUMMARY_PROMPT_HEADER.format(channel_id=channel_id)
+    for message in messages:
+        if message.get("user") is not None:
+            prompt += f"\n<@{message['user']}> の発言: {message.get('text') or ''}\n"
+    return prompt
+
+
+def _dedup_key(text: str) -> str:
+    """Normalize whitespace and case for duplicate detection"""
+    return " ".join(text.split()).lower()
+
+
+def _abbreviate_code_block(code: str) -> str:
+    """Keep only the first lines of a large code block"""
+    lines = code.strip("\n").split("\n")
+    if len(lines) <= MAX_CODE_BLOCK_LINES:
+        return f"```{code}```"
+    kept = "\n".join(lines[:MAX_CODE_BLOCK_LINES])
+    return f"```{kept}\n... (省略: 残り{len(lines) - MAX_CODE_BLOCK_LINES}行)```"
+
+
+def _dedup_text(text: str, seen_lines: set, seen_code_blocks: set) -> str:
+    """
+    Drop repeated prose lines and repeated code blocks
+
+    Code blocks are compared as whole units so that fences and abbreviation
+    markers are never removed on their own.
+    """
+    # With one capturing group, odd indices hold code block contents
+    parts = _CODE_BLOCK_PATTERN.split(text)
+    result = []
+    for index, part in enumerate(parts):
+        if index % 2 == 1:
+            key = _dedup_key(part)
+            if len(key) >= MIN_DEDUP_CHARS:
+                if key in seen_code_blocks:
+                    result.append("(既出のコードブロック)")
+                    continue
+                seen_code_blocks.add(key)
+            result.append(_abbreviate_code_block(part))
+            continue
+
+        lines = []
+        for line in part.split("\n"):
+            key = _dedup_key(line)
+            if len(key) >= MIN_DEDUP_CHARS:
+                if key in seen_lines:
+                    continue
+                seen_lines.add(key)
+            lines.append(line)
+        result.append("\n".join(lines))
+    return "".join(result)
+
+
+def _truncate(text: str) -> str:
+    """Cut a long message, closing any code block left open by the cut"""
+    if len(text) <= MAX_MESSAGE_CHARS:
+        return text
+    text = text[:MAX_MESSAGE_CHARS]
+    if text.count("```") % 2 == 1:
+        text = text.rstrip("`") + "\n```"
+    return text + "…(省略)"
+
+
+def _compact_text(
+    message: Dict[str, Any],
+    seen_lines: set,
+    seen_code_blocks: set,
+    seen_links: set,
+    resolve_alias: Callable[[str], str],
+) -> str:
+    """Drop repeated content and abbreviate code blocks, links, mentions and attachments"""
+    text = _dedup_text(message.get("text") or "", seen_lines, seen_code_blocks)
+
+    def replace_link(match: "re.Match") -> str:
+        url, label = match.group(1), match.group(2)
+        if url in seen_links:
+            return label or "(既出のリンク)"
+        seen_links.add(url)
+        return f"{label} ({url})" if label else url
+
+    text = _LINK_PATTERN.sub(replace_link, text)
+    text = _MENTION_PATTERN.sub(lambda m: f"@{resolve_alias(m.group(1))}", text)
+
+    text = _truncate(text)
+
+    for file in message.get("files", []):
+        text += f"\n[ファイル: {file.get('name') or file.get('title') or '添付'}]"
+    for attachment in message.get("attachments", []):
+        title = attachment.get("title") or attachment.get("fallback")
+        if title:
+            text += f"\n[添付: {title[:100]}]"
+    return text.strip()
+
+
+def compact_messages(
+    messages: List[Dict[str, Any]],
+    client: Any,
+    aliases: UserAliasCache,
+) -> List[Tuple[str, str]]:
+    """
+    Filter, deduplicate and collapse channel messages
+
+    Args:
+        messages: Channel messages in chronological order
+        client: Slack WebClient used to resolve user aliases
+        aliases: Cache of user aliases
+
+    Returns:
+        List of (alias, text) pairs with consecutive messages from the
+        same user merged
+    """
+    seen_lines: set = set()
+    seen_code_blocks: set = set()
+    seen_links: set = set()
+    compacted: List[Tuple[str, str]] = []
+    last_user: Optional[str] = None
+
+    def resolve_alias(user_id: str) -> str:
+        return aliases.get(client, user_id)
+
+    for message in messages:
+        user_id = message.get("user")
+        if user_id is None or message.get("bot_id") is not None:
+            continue
+        if message.get("subtype") in SKIPPED_SUBTYPES:
+            continue
+
+        text = _compact_text(message, seen_lines, seen_code_blocks, seen_links, resolve_alias)
+        if not text:
+            continue
+
+        if user_id == last_user:
+            alias, previous = compacted[-1]
+            compacted[-1] = (alias, f"{previous}\n{text}")
+        else:
+            compacted.append((resolve_alias(user_id), text))
+            last_user = user_id
+    return compacted
+
+
+def build_summary_prompt(
+    channel_id: str,
+    messages: List[Dict[str, Any]],
+    client: Any,
+    aliases: UserAliasCache,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Build a compacted channel summary prompt
+
+    Args:
+        channel_id: ID of the channel being summarized
+        messages: Channel messages in chronological order
+        client: Slack WebClient used to resolve user aliases
+        aliases: Cache of user aliases
+
+    Returns:
+        The prompt and estimated token counts before and after compaction
+    """
+    prompt = SUMMARY_PROMPT_HEADER.format(channel_id=channel_id)
+    for alias, text in compact_messages(messages, client, aliases):
+        prompt += f"\n{alias}: {text}\n"
+
+    original_tokens = estimate_tokens(_verbatim_prompt(channel_id, messages))
+    compacted_tokens = estimate_tokens(prompt)
+    stats = {
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "saved_tokens": original_tokens - compacted_tokens,
+    }
+    return prompt, stats
@@ -6,10 +6,14 @@ from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
 from app.gemini_client import GeminiClient
+from app.transcript import UserAliasCache, build_summary_prompt
 
 # Refer to https://tools.slack.dev/bolt-python/concepts/assistant/ for more details
 assistant = Assistant()
 
+# users_info の結果をリクエスト間で再利用するためのキャッシュ
+user_aliases = UserAliasCache()
+
 
 def call_gemini(
     messages_in_thread: List[Dict[str, str]],
@@ -106,10 +110,17 @@ def respond_in_assistant_thread(
                 else:
                     raise e
 
-            prompt = f"Slackチャンネル <#{referred_channel_id}> のメッセージを簡潔に要約してください:\n\n"
-            for message in reversed(channel_history.get("messages")):
-                if message.get("user") is not None:
-                    prompt += f"\n<@{message['user']}> の発言: {message['text']}\n"
+            # ノイズや重複を除去してプロンプトを圧縮
+            prompt, stats = build_summary_prompt(
+                referred_channel_id,
+                list(reversed(channel_history.get("messages"))),
+                client,
+                user_aliases,
+            )
+            logger.info(
+                f"要約プロンプトを圧縮しました: 推定トークン数 {stats['original_tokens']} -> "
+                f"{stats['compacted_tokens']} ({stats['saved_tokens']} 削減)"
+            )
             
             messages_in_thread = [{"role": "user", "content": prompt}]
             returned_message = call_gemini(messages_in_thread, gemini_client)
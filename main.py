@@ -11,7 +11,7 @@ from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from dotenv import load_dotenv
 
-from app.gemini_client import GeminiClient
+from app.gemini_client import GeminiClient, HedgingPolicy
 from listeners import register_listeners
 
 # 環境変数を読み込み
@@ -30,11 +30,21 @@ app = App(
     signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
 )
 
+# テールレイテンシ削減のためのヘッジリクエスト設定 (任意)
+hedging = None
+if os.environ.get("GEMINI_HEDGE_ENABLED", "false").lower() == "true":
+    hedging = HedgingPolicy(
+        percentile=float(os.environ.get("GEMINI_HEDGE_PERCENTILE", "0.95")),
+        max_hedge_ratio=float(os.environ.get("GEMINI_HEDGE_MAX_RATIO", "0.1")),
+    )
+
 # Gemini クライアントを初期化
 gemini_client = GeminiClient(
     project_id=os.environ.get("GCP_PROJECT_ID"),
     location=os.environ.get("VERTEX_AI_LOCATION", "us-central1"),
-    model_name=os.environ.get("VERTEX_AI_MODEL", "gemini-2.5-flash")
+    model_name=os.environ.get("VERTEX_AI_MODEL", "gemini-2.5-flash"),
+    hedging=hedging,
+    hedge_location=os.environ.get("VERTEX_AI_HEDGE_LOCATION"),
 )
 
 # Gemini クライアントをアプリコンテキストに保存してリスナーでアクセス可能にする
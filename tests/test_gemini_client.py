@@ -2,9 +2,12 @@
 Tests for Gemini VertexAI client
 """
 
+import asyncio
+import threading
+
 import pytest
-from unittest.mock import Mock, patch
-from app.gemini_client import GeminiClient
+from unittest.mock import AsyncMock, Mock, patch
+from app.gemini_client import GeminiClient, HedgingPolicy
 
 
 class TestGeminiClient:
@@ -119,4 +122,194 @@ class TestGeminiClient:
         
         # Check that stream=True was passed
         call_args = mock_model.generate_content.call_args
-        assert call_args[1]['stream'] is True
\ No newline at end of file
+        assert call_args[1]['stream'] is True
+
+
+class TestHedgingPolicy:
+    """Test cases for HedgingPolicy"""
+    
+    def test_hedge_delay_uses_initial_delay_without_samples(self):
+        """Test that the initial delay is used until enough samples exist"""
+        policy = HedgingPolicy(initial_delay=1.5, min_samples=3)
+        policy.record_latency(0.1)
+        
+        assert policy.hedge_delay() == 1.5
+    
+    def test_hedge_delay_uses_percentile(self):
+        """Test that the hedge delay follows the observed latency percentile"""
+        policy = HedgingPolicy(percentile=0.9, min_samples=10, min_delay=0.0)
+        for i in range(1, 11):
+            policy.record_latency(i / 10)
+        
+        assert policy.hedge_delay() == pytest.approx(0.9)
+    
+    def test_hedge_budget_is_capped(self):
+        """Test that hedges are limited by the per-request budget"""
+        policy = HedgingPolicy(max_hedge_ratio=0.5)
+        
+        policy.on_request()
+        assert not policy.try_acquire_hedge()
+        policy.on_request()
+        assert policy.try_acquire_hedge()
+        assert not policy.try_acquire_hedge()
+        assert policy.hedges_issued == 1
+
+
+class TestGeminiClientHedging:
+    """Test cases for hedged response generation"""
+    
+    @staticmethod
+    def _chunk(text):
+        chunk = Mock()
+        chunk.text = text
+        return chunk
+    
+    def _stream(self, *texts, delay=0.0, closed=None):
+        """Create a generate_content_async side effect yielding the given chunks"""
+        async def response_stream():
+            try:
+                await asyncio.sleep(delay)
+                for text in texts:
+                    yield self._chunk(text)
+            finally:
+                if closed is not None:
+                    closed.set()
+        
+        return lambda *args, **kwargs: response_stream()
+    
+    def _model(self, side_effect):
+        model = Mock()
+        model.generate_content_async = AsyncMock(side_effect=side_effect)
+        return model
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_fast_primary_does_not_hedge(self, mock_generative_models, mock_aiplatform):
+        """Test that no hedge is issued when the first token arrives in time"""
+        mock_model = self._model(self._stream("Hello ", "there!"))
+        mock_generative_models.GenerativeModel.return_value = mock_model
+        
+        policy = HedgingPolicy(initial_delay=5.0, max_hedge_ratio=1.0)
+        client = GeminiClient("test-project", "us-central1", hedging=policy)
+        response = client.generate_response("Hello")
+        
+        assert response == "Hello there!"
+        mock_model.generate_content_async.assert_called_once()
+        assert mock_model.generate_content_async.call_args[1]['stream'] is True
+        assert policy.hedges_issued == 0
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_slow_primary_is_hedged_and_cancelled(self, mock_generative_models, mock_aiplatform):
+        """Test that a hedge to the secondary region wins and the stalled primary is stopped"""
+        primary_closed = threading.Event()
+        primary_model = self._model(self._stream("slow", delay=5, closed=primary_closed))
+        hedge_model = self._model(self._stream("fast"))
+        mock_generative_models.GenerativeModel.side_effect = [primary_model, hedge_model]
+        
+        policy = HedgingPolicy(initial_delay=0.05, max_hedge_ratio=1.0)
+        client = GeminiClient(
+            "test-project", "us-central1", hedging=policy, hedge_location="asia-northeast1"
+        )
+        response = client.generate_response("Hello")
+        
+        assert response == "fast"
+        mock_aiplatform.init.assert_any_call(project="test-project", location="asia-northeast1")
+        assert mock_aiplatform.init.call_args[1]["location"] == "us-central1"
+        assert policy.hedges_issued == 1
+        assert policy.hedges_won == 1
+        
+        # The loser is cancelled rather than left running until it produces a token
+        assert primary_closed.wait(1)
+        pending = asyncio.run_coroutine_threadsafe(_pending_tasks(), client._loop).result(1)
+        assert pending == 0
+        
+        # The hedge's sample is timed from when it was issued, while the
+        # cancelled primary's censored sample is timed from the request start
+        hedge_sample, primary_sample = policy._latencies
+        assert hedge_sample < 0.05
+        assert primary_sample >= 0.05
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_cancelled_hedge_records_no_sample(self, mock_generative_models, mock_aiplatform):
+        """Test that a losing hedge does not record a censored latency sample"""
+        hedge_closed = threading.Event()
+        primary_model = self._model(self._stream("primary", delay=0.25))
+        hedge_model = self._model(self._stream("hedge", delay=5, closed=hedge_closed))
+        mock_generative_models.GenerativeModel.side_effect = [primary_model, hedge_model]
+        
+        policy = HedgingPolicy(initial_delay=0.2, max_hedge_ratio=1.0)
+        client = GeminiClient(
+            "test-project", "us-central1", hedging=policy, hedge_location="asia-northeast1"
+        )
+        response = client.generate_response("Hello")
+        
+        assert response == "primary"
+        assert policy.hedges_issued == 1
+        assert policy.hedges_won == 0
+        assert hedge_closed.wait(1)
+        [primary_sample] = policy._latencies
+        assert primary_sample >= 0.25
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_failed_primary_falls_back_to_hedge(self, mock_generative_models, mock_aiplatform):
+        """Test that the hedge answer is returned when the primary raises"""
+        async def failing_stream():
+            await asyncio.sleep(0.1)
+            raise Exception("API Error")
+            yield  # pragma: no cover
+        
+        primary_model = self._model(lambda *args, **kwargs: failing_stream())
+        hedge_model = self._model(self._stream("hedged", delay=0.2))
+        mock_generative_models.GenerativeModel.side_effect = [primary_model, hedge_model]
+        
+        policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=1.0)
+        client = GeminiClient(
+            "test-project", "us-central1", hedging=policy, hedge_location="asia-northeast1"
+        )
+        response = client.generate_response("Hello")
+        
+        assert response == "hedged"
+        assert policy.hedges_won == 1
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_all_attempts_failing_returns_error(self, mock_generative_models, mock_aiplatform):
+        """Test that the error message is returned when both attempts fail"""
+        async def failing_stream():
+            await asyncio.sleep(0.05)
+            raise Exception("API Error")
+            yield  # pragma: no cover
+        
+        mock_model = self._model(lambda *args, **kwargs: failing_stream())
+        mock_generative_models.GenerativeModel.return_value = mock_model
+        
+        policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=1.0)
+        client = GeminiClient("test-project", "us-central1", hedging=policy)
+        response = client.generate_response("Hello")
+        
+        assert "encountered an error" in response
+        assert mock_model.generate_content_async.call_count == 2
+        assert policy.hedges_won == 0
+    
+    @patch('app.gemini_client.aiplatform')
+    @patch('app.gemini_client.generative_models')
+    def test_hedge_skipped_without_budget(self, mock_generative_models, mock_aiplatform):
+        """Test that the primary call is awaited when the hedge budget is exhausted"""
+        mock_model = self._model(self._stream("primary", delay=0.1))
+        mock_generative_models.GenerativeModel.return_value = mock_model
+        
+        policy = HedgingPolicy(initial_delay=0.01, max_hedge_ratio=0.0)
+        client = GeminiClient("test-project", "us-central1", hedging=policy)
+        response = client.generate_response("Hello")
+        
+        assert response == "primary"
+        mock_model.generate_content_async.assert_called_once()
+        assert policy.hedges_issued == 0
+
+
+async def _pending_tasks():
+    """Count tasks other than the current one on the running loop"""
+    return len(asyncio.all_tasks() - {asyncio.current_task()})
@@ -0,0 +1,212 @@
+"""
+Tests for channel transcript compaction
+"""
+
+from unittest.mock import Mock
+from app.transcript import (
+    MAX_MESSAGE_CHARS,
+    UserAliasCache,
+    build_summary_prompt,
+    compact_messages,
+)
+
+
+def make_client(names=None):
+    """Create a mock Slack client resolving user IDs to display names"""
+    names = names or {"U1": "alice", "U2": "bob"}
+    client = Mock()
+    client.users_info.side_effect = lambda user: {
+        "user": {"name": user, "profile": {"display_name": names.get(user, "")}}
+    }
+    return client
+
+
+class TestUserAliasCache:
+    """Test cases for UserAliasCache"""
+    
+    def test_lookup_is_cached(self):
+        """Test that users_info is called only once per user"""
+        client = make_client()
+        aliases = UserAliasCache()
+        
+        assert aliases.get(client, "U1") == "alice"
+        assert aliases.get(client, "U1") == "alice"
+        client.users_info.assert_called_once_with(user="U1")
+    
+    def test_lookup_failure_falls_back_to_user_id(self):
+        """Test that the user ID is used when users_info fails"""
+        client = Mock()
+        client.users_info.side_effect = Exception("missing_scope")
+        
+        assert UserAliasCache().get(client, "U9") == "U9"
+    
+    def test_failed_lookup_is_retried(self):
+        """Test that a failed lookup is not cached once the failure TTL expires"""
+        client = make_client()
+        client.users_info.side_effect = [
+            Exception("ratelimited"),
+            {"user": {"name": "alice", "profile": {"display_name": "alice"}}},
+        ]
+        aliases = UserAliasCache(failure_ttl=0)
+        
+        assert aliases.get(client, "U1") == "U1"
+        assert aliases.get(client, "U1") == "alice"
+        assert client.users_info.call_count == 2
+    
+    def test_failed_lookup_is_not_retried_within_ttl(self):
+        """Test that repeated lookups within the failure TTL do not call users_info"""
+        client = Mock()
+        client.users_info.side_effect = Exception("ratelimited")
+        aliases = UserAliasCache(failure_ttl=60)
+        
+        assert aliases.get(client, "U1") == "U1"
+        assert aliases.get(client, "U1") == "U1"
+        client.users_info.assert_called_once()
+
+
+class TestCompactMessages:
+    """Test cases for compact_messages"""
+    
+    def test_filters_noise_subtypes_and_bots(self):
+        """Test that join messages and bot messages are dropped"""
+        messages = [
+            {"user": "U1", "subtype": "channel_join", "text": "<@U1> has joined the channel"},
+            {"user": "U2", "bot_id": "B1", "text": "Deploy finished"},
+            {"user": "U1", "text": "こんにちは"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [("alice", "こんにちは")]
+    
+    def test_collapses_consecutive_messages(self):
+        """Test that consecutive messages from the same user are merged"""
+        messages = [
+            {"user": "U1", "text": "first"},
+            {"user": "U1", "text": "second"},
+            {"user": "U2", "text": "third"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [("alice", "first\nsecond"), ("bob", "third")]
+    
+    def test_deduplicates_content_and_links(self):
+        """Test that repeated lines and links are not included twice"""
+        messages = [
+            {"user": "U1", "text": "Please review the design doc <https://example.com/doc|doc>"},
+            {"user": "U2", "text": "Please review the design doc <https://example.com/doc|doc>"},
+            {"user": "U2", "text": "See also <https://example.com/doc>"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [
+            ("alice", "Please review the design doc doc (https://example.com/doc)"),
+            ("bob", "See also (既出のリンク)"),
+        ]
+    
+    def test_keeps_link_labels(self):
+        """Test that link labels are kept and repeated links keep only the label"""
+        messages = [
+            {"user": "U1", "text": "<https://example.com/a/very/long/path|設計書> を見てください"},
+            {"user": "U2", "text": "<https://example.com/a/very/long/path|設計書> 確認しました"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [
+            ("alice", "設計書 (https://example.com/a/very/long/path) を見てください"),
+            ("bob", "設計書 確認しました"),
+        ]
+    
+    def test_abbreviates_code_blocks_and_files(self):
+        """Test that large code blocks and attachments are abbreviated"""
+        code = "\n".join(f"line{i}" for i in range(20))
+        messages = [
+            {"user": "U1", "text": f"```{code}```", "files": [{"name": "dump.log"}]},
+        ]
+        
+        [(alias, text)] = compact_messages(messages, make_client(), UserAliasCache())
+        assert "line4" in text
+        assert "line5" not in text
+        assert "残り15行" in text
+        assert "[ファイル: dump.log]" in text
+    
+    def test_truncated_code_blocks_keep_fences(self):
+        """Test that truncated code blocks from different users both stay closed"""
+        code_a = "\n".join(f"a{i}" for i in range(8))
+        code_b = "\n".join(f"b{i}" for i in range(8))
+        messages = [
+            {"user": "U1", "text": f"```{code_a}```"},
+            {"user": "U2", "text": f"```{code_b}```"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [
+            ("alice", "```a0\na1\na2\na3\na4\n... (省略: 残り3行)```"),
+            ("bob", "```b0\nb1\nb2\nb3\nb4\n... (省略: 残り3行)```"),
+        ]
+    
+    def test_code_blocks_with_shared_lines_keep_fences(self):
+        """Test that code lines shared between snippets are not deduplicated"""
+        messages = [
+            {"user": "U1", "text": "```import numpy as np\nx=1```"},
+            {"user": "U2", "text": "```import numpy as np\ny=2```"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [
+            ("alice", "```import numpy as np\nx=1```"),
+            ("bob", "```import numpy as np\ny=2```"),
+        ]
+    
+    def test_repeated_code_block_is_deduplicated(self):
+        """Test that an identical code block is replaced as a whole"""
+        messages = [
+            {"user": "U1", "text": "```print('hello world')```"},
+            {"user": "U2", "text": "同じです ```print('hello world')```"},
+        ]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [
+            ("alice", "```print('hello world')```"),
+            ("bob", "同じです (既出のコードブロック)"),
+        ]
+    
+    def test_truncation_closes_open_code_block(self):
+        """Test that cutting a long message inside a code block keeps fences balanced"""
+        code = "\n".join("x" * 20 for _ in range(4))
+        messages = [{"user": "U1", "text": "a" * (MAX_MESSAGE_CHARS - 10) + f"```{code}```"}]
+        
+        [(alias, text)] = compact_messages(messages, make_client(), UserAliasCache())
+        assert text.endswith("```…(省略)")
+        assert text.count("```") % 2 == 0
+    
+    def test_resolves_mentions(self):
+        """Test that user mentions are replaced with aliases"""
+        messages = [{"user": "U1", "text": "<@U2> 確認お願いします"}]
+        
+        result = compact_messages(messages, make_client(), UserAliasCache())
+        assert result == [("alice", "@bob 確認お願いします")]
+
+
+class TestBuildSummaryPrompt:
+    """Test cases for build_summary_prompt"""
+    
+    def test_reports_token_savings(self):
+        """Test that the compacted prompt is smaller than the verbatim prompt"""
+        messages = [{"user": "U1", "subtype": "channel_join", "text": "<@U1> has joined"}]
+        messages += [{"user": "U1", "text": "同じ内容のメッセージを繰り返し投稿しています"}] * 5
+        
+        prompt, stats = build_summary_prompt("C1", messages, make_client(), UserAliasCache())
+        
+        assert prompt.startswith("Slackチャンネル <#C1>")
+        assert prompt.count("同じ内容") == 1
+        assert stats["compacted_tokens"] < stats["original_tokens"]
+        assert stats["saved_tokens"] == stats["original_tokens"] - stats["compacted_tokens"]
+    
+    def test_message_without_text_does_not_fail(self):
+        """Test that token estimation tolerates messages without text"""
+        messages = [{"user": "U1", "subtype": "channel_join"}, {"user": "U1", "text": "こんにちは"}]
+        
+        prompt, stats = build_summary_prompt("C1", messages, make_client(), UserAliasCache())
+        
+        assert "alice: こんにちは" in prompt
+        assert stats["original_tokens"] > 0